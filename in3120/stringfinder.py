@@ -30,7 +30,7 @@ class StringFinder:
         """
         node: Trie  # The current position in the trie, after having consumed zero or more characters.
         begin: int  # The index into the original buffer where the state was "born".
-        match: str  # The symbols consumed so far to get to the current state.
+        first: int  # The index into the scan's consumed fragments where the state's match starts.
 
     @dataclass
     class Result:
@@ -62,6 +62,14 @@ class StringFinder:
         # "bookmark" for potential matches
         # NOTE TO SELF: type hint is not "necessary" but added readability + import 
         active_states: List[self.State] = []
+        # survivors are collected here and the two lists then swap roles, so no new lists are made per token
+        spare_states: List[self.State] = []
+
+        # everything consumed so far, i.e., normalized tokens and the spaces between them
+        # NOTE TO SELF: all live states have consumed the same fragments since they were born, so a state's
+        # match can be recovered from these when needed instead of being built up char by char
+        fragments: List[str] = []
+        limit = 256  # how many fragments we let pile up before forgetting the ones that are no longer needed
 
         # process tokens one by one
         # goes through (term, span) -> span = (begin, end)
@@ -70,41 +78,40 @@ class StringFinder:
             new_state = self.State(
                 self._trie, # start at root of dict
                 token_begin,# remember where this potential match started
-                "")         # No char matched yet
+                len(fragments)) # match starts with the current token
             # append to list
             active_states.append(new_state)
+            fragments.append(token)
 
-            # process each character of current token
-            for char in token:
-                surviving_states: List[self.State] = []
-                
-                # goes through active states
-                for state in active_states:
-                    next_node = state.node.child(char)
-
-                    # checks if current trie node ^accepts char
-                    if next_node is not None:
-                        # if true
-                        state.node = next_node  # move to next trie node
-                        state.match += char     # add char to match
-                        surviving_states.append(state)# keep state
-                    # if not true, state dies (no match)
-                # replace old with "surviving" active states
-                active_states = surviving_states
+            # process the whole current token, one state at a time
+            # NOTE TO SELF: states advance independently of each other, so there's no need to move them all
+            # in lockstep char by char. consume() walks the trie in one call per state, not one call per char
 
-            # after process, check if any states complete match
-            new_surviving_states: List[self.State] = []
+            # goes through active states
+            for state in active_states:
+                next_node = state.node.consume(token)
+
+                # checks if current trie node ^accepts all chars
+                if next_node is not None:
+                    # if true
+                    state.node = next_node  # move to next trie node
+                    spare_states.append(state)# keep state
+                # if not true, state dies (no match)
+            # replace old with "surviving" active states, and empty the old list for reuse
+            active_states, spare_states = spare_states, active_states
+            del spare_states[:]
 
+            # after process, check if any states complete match
             for state in active_states:
                 # checks if state is at final node
                 if state.node.is_final():
                     # found match
                     phrase = buffer[state.begin : token_end]
-                    clean_phrase = " ".join(phrase.split()) # normalize whitespace
+                    clean_phrase = phrase if phrase.isalnum() else " ".join(phrase.split()) # normalize whitespace, if there's any
                     
                     # yield match
                     yield self.Result(
-                        state.match,    # matched dict entry
+                        "".join(fragments[state.first:]), # matched dict entry
                         state.node.get_meta(),  # match's metadata
                         clean_phrase,   # how it appears in original
                         state.begin,    # start pos in orgininal buffer
@@ -116,11 +123,23 @@ class StringFinder:
                 if (token_end < len(buffer) and buffer[token_end] == " " and (next_node is not None)):
                     # can continue to next token
                     state.node = next_node  # advance
-                    state.match += " "      # adds space to match
-                    new_surviving_states.append(state)  # keep for next iter
+                    spare_states.append(state)  # keep for next iter
 
             # keep states that can continue
             if token_end < len(buffer) and buffer[token_end] == " ":
-                active_states = new_surviving_states
+                active_states, spare_states = spare_states, active_states
+                fragments.append(" ")   # adds space to match
             # if no space, can't continue
+            del spare_states[:]
+
+            # forget the fragments that no live state reaches back to, so that memory is bounded by the longest
+            # match in progress rather than by the length of the buffer. Only done once the fragments have grown
+            # to twice what was left the last time, so the cost per token stays constant on average
+            # NOTE TO SELF: states are kept in the order they were born, so the first one reaches back the furthest
+            if len(fragments) >= limit:
+                dead = active_states[0].first if active_states else len(fragments)
+                del fragments[:dead]
+                for state in active_states:
+                    state.first -= dead
+                limit = 2 * len(fragments) + 256
         #raise NotImplementedError("You need to implement this as part of the obligatory assignment.")
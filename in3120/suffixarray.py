@@ -2,11 +2,9 @@
 # pylint: disable=too-few-public-methods
 # pylint: disable=line-too-long
 
-from bisect import bisect_left
-from itertools import takewhile
 from dataclasses import dataclass
-from typing import Iterator, Iterable, Tuple, List
-from collections import Counter
+from typing import Iterator, Iterable, List
+import numpy as np
 from .document import Document
 from .corpus import Corpus
 from .analyzer import Analyzer
@@ -39,8 +37,11 @@ class SuffixArray:
     def __init__(self, corpus: Corpus, fields: Iterable[str], analyzer: Analyzer):
         self._corpus = corpus
         self._analyzer = analyzer
-        self._haystack: List[Tuple[int, str]] = []  # The (<document identifier>, <searchable content>) pairs.
-        self._suffixes: List[Tuple[int, int]] = []  # The sorted (<haystack index>, <start offset>) pairs.
+        self._haystack: List[int] = []              # The document identifiers of the haystack entries.
+        self._buffer: bytes = b""                   # The searchable content of all haystack entries, UTF-8 encoded and concatenated.
+        self._offsets: np.ndarray = np.empty(0, dtype=np.int64)    # The byte offsets into the buffer where each haystack entry starts.
+        self._suffixes: np.ndarray = np.empty(0, dtype=np.int32)   # The sorted byte offsets into the buffer where the suffixes start.
+        self._documents: np.ndarray = np.empty(0, dtype=np.int32)  # The haystack index of each suffix, parallel to the suffixes.
         self._build_suffix_array(fields)  # Construct the haystack and the suffix array itself.
 
     def _build_suffix_array(self, fields: Iterable[str]) -> None:
@@ -52,44 +53,129 @@ class SuffixArray:
         # delimiter to separate content for different docs and fields
         delimiter = " \0 "
 
+        # the searchable content of each haystack entry, UTF-8 encoded
+        # NOTE TO SELF: only the encoded content is kept around, and only until it's been concatenated
+        encoded: List[bytes] = []
+
         for doc in self._corpus:
-            text = ""
+            parts: List[str] = []
 
             for field in fields:
                 # get content from field, and normalize through analyzer
-                text += self._analyzer.join(str(doc.get_field(field, " ")))
-                text += delimiter # separating fields
+                parts.append(self._analyzer.join(str(doc.get_field(field, " "))))
+                parts.append(delimiter) # separating fields
 
             # storing doc_id and its text
-            self._haystack.append((doc.get_document_id(), text))
-
-        # index for searching
-        doc_index = 0
-
-        # goes through the haystack
-        for _, content in self._haystack:
-            # look at each character position in the document's content
-            for offset in range(len(content)):
-            # checks if offset is at the start (0) or at the start of a word's boundary
-            # example: in the text "Hello world" only pos 0 and 6 is valid
-                if offset == 0 or content[offset - 1] in (" ", "\0"):
-                    # store pointer to this suffix: (doc_index, character_pos)
-                    self._suffixes.append((doc_index, offset))
-            doc_index += 1 # next posision
-
-        # sort suffixes alphabetically
-        self._suffixes.sort(
-            key=lambda 
-            pair: self._haystack[pair[0]][1][pair[1]:]
-            )
-        #raise NotImplementedError("You need to implement this as part of the obligatory assignment.")
-
-    def _get_suffix(self, pair: Tuple[int, int]) -> str:
+            # NOTE TO SELF: joining once copies each part once, unlike repeated string concatenation
+            self._haystack.append(doc.get_document_id())
+            encoded.append("".join(parts).encode("utf-8"))
+
+        # concatenate all content into one buffer, remembering where each haystack entry starts
+        # NOTE TO SELF: every entry ends with the delimiter, so suffixes never match across entries
+        lengths = np.fromiter((len(content) for content in encoded), dtype=np.int64, count=len(encoded))
+        self._offsets = np.cumsum(lengths) - lengths
+        self._buffer = b"".join(encoded)
+
+        # a suffix starts at offset 0 or at the start of a word's boundary, i.e., right after a space or a null
+        # example: in the text "Hello world" only pos 0 and 6 is valid
+        # NOTE TO SELF: these bytes never occur inside multi-byte UTF-8 sequences
+        symbols = np.frombuffer(self._buffer, dtype=np.uint8)
+        starts = np.empty(symbols.size, dtype=bool)
+        starts[:1] = True
+        starts[1:] = (symbols[:-1] == 0x20) | (symbols[:-1] == 0x00)
+        suffixes = np.flatnonzero(starts)
+
+        # sort suffixes alphabetically, using the rank of each suffix among all suffixes
+        ranks = self._rank_suffixes(self._buffer)
+        suffixes = suffixes[np.argsort(ranks[suffixes])]
+
+        # keep the suffixes as parallel arrays of small integers rather than as a list of tuples
+        # NOTE TO SELF: an int32 takes 4 bytes, while a (haystack index, offset) tuple takes ~100
+        dtype = np.int32 if len(self._buffer) < 2**31 else np.int64
+        self._suffixes = suffixes.astype(dtype)
+        self._documents = (np.searchsorted(self._offsets, suffixes, side="right") - 1).astype(np.int32)
+
+    @staticmethod
+    def _rank_suffixes(buffer: bytes) -> np.ndarray:
+        """
+        Computes the lexicographical rank of every suffix of the given buffer, using prefix doubling as
+        described in the paper "Suffix Arrays: A New Method for On-Line String Searches" by Manber and Myers.
+        I.e., in round k all suffixes are sorted by their first n * 2^k symbols, using the ranks from the previous
+        round as integer sort keys. Only suffixes that are not yet uniquely ranked take part in each round.
+
+        The returned array holds, for each byte offset, the rank of the suffix that starts there. Sorting
+        on bytes gives the same order as sorting on strings, since UTF-8 preserves code point order.
         """
-        Produces the suffix/substring from the normalized document buffer for the given (index, offset) pair.
+        symbols = np.frombuffer(buffer, dtype=np.uint8)
+        length = symbols.size
+        ranks = np.zeros(length, dtype=np.int64)
+
+        # get a head start by sorting all suffixes on their first few symbols in one go, packed into a single 64-bit
+        # integer. Symbols are shifted up by one, so that suffixes that end within those symbols are padded with zeros
+        # and sort first. The fewer bits a symbol needs the more symbols fit, e.g., 9 for lowercased ASCII but only 7
+        # for arbitrary UTF-8
+        width = (int(symbols.max(initial=0)) + 1).bit_length()
+        span = 63 // width
+        window = np.zeros(length, dtype=np.int64)
+        for shift in range(span):
+            window <<= width
+            tail = symbols[shift:]
+            window[:tail.size] |= tail.astype(np.int64) + 1
+        active = np.argsort(window, kind="stable")
+        window = window[active]
+
+        # the suffixes not yet uniquely ranked, sorted by their keys. A key packs the (<rank of the first n symbols>,
+        # <rank of the next n symbols>) pair into a single integer. Initially, all suffixes have rank 0, and the
+        # next few symbols are ranked by the distinct values among the packed windows
+        keys = np.zeros(length, dtype=np.int64)
+        np.cumsum(window[1:] != window[:-1], out=keys[1:])
+        step = span
+
+        while active.size:
+            # suffixes with the same rank are laid out contiguously, and occupy the positions in the sorted order
+            # that start at that rank. A suffix's new rank is where its run of equal keys starts
+            positions = np.arange(active.size)
+            heads = keys >> 32
+            groups = np.concatenate(([True], heads[1:] != heads[:-1]))
+            subgroups = np.concatenate(([True], keys[1:] != keys[:-1]))
+            firsts = np.maximum.accumulate(np.where(groups, positions, 0))
+            subfirsts = np.maximum.accumulate(np.where(subgroups, positions, 0))
+            ranks[active] = heads + (subfirsts - firsts)
+
+            # suffixes that are alone with their key have a final rank, and are done
+            singletons = subgroups & np.concatenate((subgroups[1:], [True]))
+            active = active[~singletons]
+
+            # double up. Suffixes that end before the next n symbols sort first
+            following = np.zeros(active.size, dtype=np.int64)
+            inside = active + step < length
+            following[inside] = ranks[active[inside] + step] + 1
+            keys = (ranks[active] << 32) | following
+            order = np.argsort(keys, kind="stable")
+            active, keys = active[order], keys[order]
+            step *= 2
+
+        return ranks
+
+    def _bound(self, query: bytes, upper: bool = False, low: int = 0) -> int:
         """
-        index, offset = pair
-        return self._haystack[index][1][offset:]  # Slicing implies copying. This should be possible to avoid.
+        Binary search for the position in the suffix array of the first suffix that is not less than the given
+        encoded query, or, if upper is set, of the first suffix that is greater than it. Only the first len(query)
+        bytes of a suffix are compared, so the suffixes in between the two bounds are exactly the ones that start
+        with the query. The comparisons never copy more than a query's worth of bytes and run at C speed, with no
+        key function being called per probe. The search can be narrowed down by giving a lower position to start from.
+        """
+        buffer, suffixes, length = self._buffer, self._suffixes, len(query)
+        high = len(suffixes)
+        while low < high:
+            middle = (low + high) // 2
+            offset = int(suffixes[middle])
+            prefix = buffer[offset:offset + length]
+            if prefix < query or (upper and prefix == query):
+                low = middle + 1
+            else:
+                high = middle
+        return low
 
     def evaluate(self, query: str, options: Options | None = None) -> Iterator[Result]:
         """
@@ -109,35 +195,27 @@ class SuffixArray:
         if not query_norm:
             return iter([])
 
-        # help method checking if suffix starts with our query
-        def matching(pair: Tuple[int, int]) -> bool:
-            return self._get_suffix(pair).startswith(query_norm)
-        
-        # binary search to quickly find starting pos with our query
-        start = bisect_left(
-            self._suffixes,     # sorted list for binary search
-            query_norm,         # what we are looking for
-            key=lambda pair: self._get_suffix(pair) # how its extracted
-        )
-
-        # collect matching suffixes using takewhile
-        # NOTE TO SELF: all matches will be consecutive due to suffixes being sorted, 
-        # therefore the takewhile will stop when a suffix doesn't match
-        matching_suffixes = takewhile(
-            matching, self._suffixes[start:] # uses starting position for the binary search ^
-        )
-
-        # counter to check occurences of query in a doc
-        counts = Counter()
-
-        # checks for and updates occurences
-        for hay_idx, _ in matching_suffixes:
-            # gets doc_id for current suffix
-            doc_id = self._haystack[hay_idx][0]
-            counts.update([doc_id]) # incremets the counter for that doc
-
-        # returns the most common documents sorted by highest counts, 
-        # and limits result based on hit_count from given options
-        for doc_id, score in counts.most_common(options.hit_count):
-            yield SuffixArray.Result(self._corpus.get_document(doc_id), score)
-        #raise NotImplementedError("You need to implement this as part of the obligatory assignment.")
+        # the buffer is UTF-8 encoded, so the query has to be, too
+        query_norm = query_norm.encode("utf-8")
+
+        # binary search twice to find the range of suffixes that start with our query
+        # NOTE TO SELF: all matches will be consecutive due to suffixes being sorted, so the range's end is never before its start
+        start = self._bound(query_norm)
+        end = self._bound(query_norm, True, start)
+
+        # count the occurences of the query in each haystack entry, in one go rather than hit by hit
+        counts = np.bincount(self._documents[start:end])
+
+        # pick out the haystack entries with the highest counts, without fully sorting all of them, and
+        # limit the result based on hit_count from given options
+        # NOTE TO SELF: only entries with matches take part, so we never sort through all the zero counts
+        matched = np.flatnonzero(counts)
+        best = min(options.hit_count, matched.size)
+        if best < 1:
+            return
+        candidates = matched[np.argpartition(-counts[matched], best - 1)[:best]]
+        candidates = candidates[np.argsort(-counts[candidates], kind="stable")]
+
+        # returns the most common documents sorted by highest counts
+        for hay_idx in candidates:
+            yield SuffixArray.Result(self._corpus.get_document(self._haystack[hay_idx]), int(counts[hay_idx]))
@@ -189,6 +189,16 @@ class SimpleTrie(Trie):
             assert string is not None
             self._add(analyzer.join(string), meta)
 
+    def consume(self, prefix: str) -> Trie | None:
+        # Same as the base class, but walks the children dictionaries directly. That saves us
+        # a method call per symbol.
+        node = self
+        for symbol in prefix:
+            node = node._children.get(symbol)  # type: ignore[assignment]
+            if node is None:
+                return None
+        return node
+
     def child(self, transition: str) -> None | Trie:
         return self._children.get(transition, None)
 
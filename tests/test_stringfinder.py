@@ -65,6 +65,25 @@ class TestStringFinder(unittest.TestCase):
         results = finder.scan("the foo bar")
         self.assertIsInstance(results, GeneratorType, "Are you using yield?")
 
+    def test_long_buffer(self):
+        trie = in3120.SimpleTrie.from_strings(["a b c", "c a"], self._analyzer)
+        finder = in3120.StringFinder(trie, self._analyzer)
+        results = list(finder.scan("a b c " * 500))
+        self.assertEqual(len(results), 999)
+        self.assertListEqual([r.match for r in results[:3]], ["a b c", "c a", "a b c"])
+        self.assertTrue(all(r.match == r.surface for r in results))
+
+    def test_scans_live_trie(self):
+        trie = in3120.SimpleTrie.from_strings(["foo"], self._analyzer)
+        finder = in3120.StringFinder(trie, self._analyzer)
+        trie.add(["bar baz"], self._analyzer)
+        self._simple_verify(finder, "foo bar baz", [("foo", "foo"), ("bar baz", "bar baz")])
+
+    def test_scans_from_given_node(self):
+        trie = in3120.SimpleTrie.from_strings(["ac", "b"], self._analyzer)
+        finder = in3120.StringFinder(trie.consume("a"), self._analyzer)
+        self._simple_verify(finder, "b c", [("c", "c")])
+
     def test_mesh_terms_in_cran_corpus(self):
         mesh = in3120.CorpusLoader.from_files(in3120.InMemoryCorpus(), ["../data/mesh.txt"])
         cran = in3120.CorpusLoader.from_files(in3120.InMemoryCorpus(), ["../data/cran.xml"])